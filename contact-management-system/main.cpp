@@ -1,19 +1,30 @@
 #include <iostream>
 #include <fstream>
-#include <vector>
+#include <map>
 #include <string>
-#include <algorithm>
-#include <sstream>
+#include <string_view>
+#include <charconv>
+#include <filesystem>
+#include <cstdint>
+#include <functional>
 
 struct Contact {
     int id;
     std::string name;
     std::string phone;
     std::string email;
+    uint64_t trigrams = 0; // Bloom mask of name/phone/email 3-grams for search
 };
 
-std::vector<Contact> contacts;
+// Keyed by id: O(log N) lookup/delete, and iteration stays in id order
+std::map<int, Contact> contacts;
 const std::string DATA_FILE = "contacts.txt";
+const std::string JOURNAL_FILE = "contacts.log";
+// Journal stays open between writes instead of being reopened per change
+std::ofstream journal;
+
+// Next id to hand out; only ever increases, so deleted ids are not reused
+int nextIdVal = 1;
 
 // Utility to trim whitespace
 std::string trim(const std::string &s) {
@@ -23,38 +34,209 @@ std::string trim(const std::string &s) {
     return s.substr(start, end - start + 1);
 }
 
-// Load contacts from file
+// Set one bit per 3-character substring of text (hashed into 64 bits)
+uint64_t trigramMask(std::string_view text) {
+    uint64_t mask = 0;
+    for (size_t i = 0; i + 3 <= text.size(); ++i) {
+        mask |= uint64_t{1} << (std::hash<std::string_view>{}(text.substr(i, 3)) & 63);
+    }
+    return mask;
+}
+
+// Recompute the search mask; call whenever a contact's fields change
+void indexContact(Contact &c) {
+    c.trigrams = trigramMask(c.name) | trigramMask(c.phone) | trigramMask(c.email);
+}
+
+Contact *findContact(int id) {
+    auto it = contacts.find(id);
+    return it == contacts.end() ? nullptr : &it->second;
+}
+
+// Return the text up to the next '|' (or end of line) and step past it
+std::string_view nextField(std::string_view line, size_t &pos) {
+    size_t end = line.find('|', pos);
+    if (end == std::string_view::npos) end = line.size();
+    std::string_view field = line.substr(pos, end - pos);
+    pos = end + 1;
+    return field;
+}
+
+// Parse a whole field as an id; false if it is not a number
+bool parseId(std::string_view field, int &id) {
+    auto [ptr, ec] = std::from_chars(field.data(), field.data() + field.size(), id);
+    return ec == std::errc() && ptr == field.data() + field.size();
+}
+
+// Parse "id|name|phone|email" starting at pos; false if the id is not a
+// number or the line does not hold exactly those four fields
+bool parseContact(std::string_view line, Contact &c, size_t pos = 0) {
+    if (pos > line.size()) return false;
+    if (!parseId(nextField(line, pos), c.id)) return false;
+    for (std::string *field : {&c.name, &c.phone, &c.email}) {
+        if (pos > line.size()) return false;
+        *field = nextField(line, pos);
+    }
+    // A fifth field means two records ran together (e.g. after a torn write)
+    if (pos <= line.size()) return false;
+    indexContact(c);
+    return true;
+}
+
+// Apply a single journal record: "A|id|name|phone|email", "U|..." or "D|id".
+// Anything else (unknown op, torn or truncated record) is rejected.
+bool applyJournalLine(std::string_view line) {
+    if (line.size() < 2 || line[1] != '|') return false;
+    Contact c;
+    switch (line[0]) {
+        case 'D':
+            if (!parseId(line.substr(2), c.id)) return false;
+            contacts.erase(c.id);
+            return true;
+        case 'A':
+        case 'U':
+            if (!parseContact(line, c, 2)) return false;
+            // Upsert so replaying a journal that was already compacted is harmless
+            contacts[c.id] = c;
+            return true;
+        default:
+            return false;
+    }
+}
+
+// Read a whole file with one read and hand each line to fn as a view into
+// the buffer, dropping any trailing '\r' from CRLF files. Returns the number
+// of lines fn rejected.
+template <typename Fn>
+int forEachLine(const std::string &path, Fn fn) {
+    int rejected = 0;
+    std::error_code ec;
+    if (!std::filesystem::is_regular_file(path, ec)) return rejected; // file not exist, skip
+    std::ifstream in(path, std::ios::binary);
+    if (!in.is_open()) return rejected;
+    std::string buf;
+    in.seekg(0, std::ios::end);
+    buf.resize(static_cast<size_t>(in.tellg()));
+    in.seekg(0, std::ios::beg);
+    in.read(buf.data(), static_cast<std::streamsize>(buf.size()));
+
+    std::string_view data(buf);
+    while (!data.empty()) {
+        size_t nl = data.find('\n');
+        std::string_view line = data.substr(0, nl);
+        data.remove_prefix(nl == std::string_view::npos ? data.size() : nl + 1);
+        if (!line.empty() && line.back() == '\r') line.remove_suffix(1);
+        if (!line.empty() && !fn(line)) ++rejected;
+    }
+    return rejected;
+}
+
+// Keep a copy of a file that had unreadable lines, since the next
+// compaction rewrites the snapshot from only the records that parsed
+void backupCorrupt(const std::string &path, int badLines) {
+    const std::string backup = path + ".bak";
+    std::error_code ec;
+    std::filesystem::copy_file(path, backup,
+                               std::filesystem::copy_options::overwrite_existing, ec);
+    if (ec) {
+        std::cerr << "[WARN] " << path << ": skipped " << badLines
+                  << " unreadable line(s); backup to " << backup
+                  << " failed: " << ec.message() << "\n";
+        return;
+    }
+    std::cerr << "[WARN] " << path << ": skipped " << badLines
+              << " unreadable line(s); original saved as " << backup << "\n";
+}
+
+// Load contacts from the snapshot file, then replay the journal on top
 void loadContacts() {
     contacts.clear();
-    std::ifstream infile(DATA_FILE);
-    if (!infile.is_open()) return; // file not exist, skip
-
-    std::string line;
-    while (std::getline(infile, line)) {
-        std::stringstream ss(line);
+    int bad = forEachLine(DATA_FILE, [](std::string_view line) {
         Contact c;
-        std::getline(ss, line, '|'); c.id = std::stoi(line);
-        std::getline(ss, c.name, '|');
-        std::getline(ss, c.phone, '|');
-        std::getline(ss, c.email, '|');
-        contacts.push_back(c);
+        if (!parseContact(line, c)) return false;
+        contacts[c.id] = c;
+        return true;
+    });
+    if (bad) backupCorrupt(DATA_FILE, bad);
+    bad = forEachLine(JOURNAL_FILE, applyJournalLine);
+    if (bad) backupCorrupt(JOURNAL_FILE, bad);
+    nextIdVal = contacts.empty() ? 1 : contacts.rbegin()->first + 1;
+}
+
+// Write a full snapshot (tmp file + rename) and truncate the journal.
+// On any failure the old snapshot and the journal are left untouched.
+bool saveContacts() {
+    const std::string tmp = DATA_FILE + ".tmp";
+    std::ofstream outfile(tmp, std::ios::trunc);
+    for (const auto &[id, c] : contacts) {
+        outfile << id << "|" << c.name << "|" << c.phone << "|" << c.email << "\n";
+    }
+    outfile.close();
+    std::error_code ec;
+    if (!outfile) {
+        std::cerr << "[WARN] Could not write " << tmp << "; keeping " << JOURNAL_FILE << "\n";
+        std::filesystem::remove(tmp, ec);
+        return false;
+    }
+    std::filesystem::rename(tmp, DATA_FILE, ec);
+    if (ec) {
+        std::cerr << "[WARN] Could not replace " << DATA_FILE << ": " << ec.message()
+                  << "; keeping " << JOURNAL_FILE << "\n";
+        std::filesystem::remove(tmp, ec);
+        return false;
+    }
+    std::ofstream truncated(JOURNAL_FILE, std::ios::trunc);
+    if (!truncated) {
+        // Replay is idempotent, so nothing is lost, but compaction will retry
+        std::cerr << "[WARN] Could not truncate " << JOURNAL_FILE << "\n";
+        return false;
     }
+    return true;
 }
 
-// Save contacts to file
-void saveContacts() {
-    std::ofstream outfile(DATA_FILE);
-    for (const auto &c : contacts) {
-        outfile << c.id << "|" << c.name << "|" << c.phone << "|" << c.email << "\n";
+// Fold the journal into a fresh snapshot once it outgrows the snapshot
+void maybeCompact() {
+    std::error_code ec;
+    auto journalSize = std::filesystem::file_size(JOURNAL_FILE, ec);
+    if (ec) return;
+    auto snapshotSize = std::filesystem::file_size(DATA_FILE, ec);
+    if (ec) snapshotSize = 0;
+    if (journalSize > 2 * snapshotSize) saveContacts();
+}
+
+// Open the journal for appending. If the last record was cut short (no
+// trailing newline), start on a fresh line so the next record stays separate
+// and the torn one is rejected on load.
+void openJournal() {
+    char last = '\n';
+    std::ifstream in(JOURNAL_FILE, std::ios::binary);
+    if (in.seekg(-1, std::ios::end)) in.get(last);
+    in.close();
+    journal.open(JOURNAL_FILE, std::ios::app);
+    if (last != '\n') journal << "\n";
+}
+
+// Append one record to the journal instead of rewriting the whole file.
+// Returns false (after reporting it) if the record could not be written;
+// callers change the in-memory map only after this succeeds.
+bool logContact(char op, const Contact &c) {
+    if (!journal.is_open()) openJournal();
+    journal << op << "|" << c.id;
+    if (op != 'D') journal << "|" << c.name << "|" << c.phone << "|" << c.email;
+    journal << "\n";
+    journal.flush();
+    if (!journal) {
+        // Drop the failed stream so the next change retries with a fresh one
+        journal.close();
+        journal.clear();
+        std::cerr << "[ERROR] Could not write to " << JOURNAL_FILE << "; change not saved.\n";
+        return false;
     }
+    return true;
 }
 
 int nextId() {
-    int maxId = 0;
-    for (const auto &c : contacts) {
-        if (c.id > maxId) maxId = c.id;
-    }
-    return maxId + 1;
+    return nextIdVal;
 }
 
 void addContact() {
@@ -66,71 +248,92 @@ void addContact() {
     std::getline(std::cin, c.phone);
     std::cout << "Enter email: ";
     std::getline(std::cin, c.email);
-    contacts.push_back(c);
-    saveContacts();
+    indexContact(c);
+    if (!logContact('A', c)) return;
+    contacts[c.id] = c;
+    ++nextIdVal;
+    maybeCompact();
     std::cout << "[OK] Contact added with ID " << c.id << "\n";
 }
 
 void listContacts() {
-    std::cout << "\nID | Name           | Phone         | Email\n";
-    std::cout << "----------------------------------------------\n";
-    for (const auto &c : contacts) {
-        std::cout << c.id << " | " << c.name << " | " << c.phone << " | " << c.email << "\n";
+    // Build the whole listing and write it once rather than per field
+    std::string out = "\nID | Name           | Phone         | Email\n";
+    out += "----------------------------------------------\n";
+    for (const auto &[id, c] : contacts) {
+        out += std::to_string(id);
+        out += " | ";
+        out += c.name;
+        out += " | ";
+        out += c.phone;
+        out += " | ";
+        out += c.email;
+        out += "\n";
     }
     if (contacts.empty()) {
-        std::cout << "(no contacts)\n";
+        out += "(no contacts)\n";
     }
+    std::cout << out;
 }
 
 void editContact() {
     std::cout << "Enter contact ID to edit: ";
     int id; std::cin >> id; std::cin.ignore();
-    for (auto &c : contacts) {
-        if (c.id == id) {
-            std::string input;
-            std::cout << "Enter new name (leave blank to keep: " << c.name << "): ";
-            std::getline(std::cin, input);
-            if (!trim(input).empty()) c.name = input;
-
-            std::cout << "Enter new phone (leave blank to keep: " << c.phone << "): ";
-            std::getline(std::cin, input);
-            if (!trim(input).empty()) c.phone = input;
-
-            std::cout << "Enter new email (leave blank to keep: " << c.email << "): ";
-            std::getline(std::cin, input);
-            if (!trim(input).empty()) c.email = input;
-
-            saveContacts();
-            std::cout << "[OK] Contact updated.\n";
-            return;
-        }
+    Contact *found = findContact(id);
+    if (!found) {
+        std::cout << "Contact not found.\n";
+        return;
     }
-    std::cout << "Contact not found.\n";
+    // Edit a copy so a failed journal write leaves the stored contact as it was
+    Contact c = *found;
+    std::string input;
+    std::cout << "Enter new name (leave blank to keep: " << c.name << "): ";
+    std::getline(std::cin, input);
+    if (!trim(input).empty()) c.name = input;
+
+    std::cout << "Enter new phone (leave blank to keep: " << c.phone << "): ";
+    std::getline(std::cin, input);
+    if (!trim(input).empty()) c.phone = input;
+
+    std::cout << "Enter new email (leave blank to keep: " << c.email << "): ";
+    std::getline(std::cin, input);
+    if (!trim(input).empty()) c.email = input;
+
+    indexContact(c);
+    if (!logContact('U', c)) return;
+    *found = c;
+    maybeCompact();
+    std::cout << "[OK] Contact updated.\n";
 }
 
 void deleteContact() {
     std::cout << "Enter contact ID to delete: ";
     int id; std::cin >> id; std::cin.ignore();
-    auto it = std::remove_if(contacts.begin(), contacts.end(), [&](const Contact &c){ return c.id == id; });
-    if (it != contacts.end()) {
-        contacts.erase(it, contacts.end());
-        saveContacts();
-        std::cout << "[OK] Contact deleted.\n";
-    } else {
+    Contact *found = findContact(id);
+    if (!found) {
         std::cout << "Contact not found.\n";
+        return;
     }
+    if (!logContact('D', *found)) return;
+    contacts.erase(id);
+    maybeCompact();
+    std::cout << "[OK] Contact deleted.\n";
 }
 
 void searchContacts() {
     std::cout << "Enter search term: ";
     std::string q; std::getline(std::cin, q);
     q = trim(q);
+    // Every 3-gram of a match is a 3-gram of some field, so a contact missing
+    // any of the query's bits cannot match and skips the substring scans
+    const uint64_t qMask = trigramMask(q);
     bool found = false;
-    for (const auto &c : contacts) {
+    for (const auto &[id, c] : contacts) {
+        if ((c.trigrams & qMask) != qMask) continue;
         if (c.name.find(q) != std::string::npos ||
             c.phone.find(q) != std::string::npos ||
             c.email.find(q) != std::string::npos) {
-            std::cout << c.id << " | " << c.name << " | " << c.phone << " | " << c.email << "\n";
+            std::cout << id << " | " << c.name << " | " << c.phone << " | " << c.email << "\n";
             found = true;
         }
     }